@@ -2,9 +2,12 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime
+from datetime import datetime, timedelta
 import locale
 
+import benchmarks
+import carteiras
+
 # Configurar locale brasileiro (tentar múltiplas opções)
 try:
     locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
@@ -31,59 +34,103 @@ def formatar_percentual(valor):
     """Formata valor como percentual"""
     return f"{valor*100:.2f}%".replace(".", ",")
 
-# Cache para carregar dados
-@st.cache_data
-def carregar_dados():
-    """Carrega todas as abas da planilha Excel"""
-    file_path = 'datainvest.xlsx'
-    
-    # Carregar cada aba
-    data_mes = pd.read_excel(file_path, sheet_name='data_mes')
-    data_ano = pd.read_excel(file_path, sheet_name='data_ano')
-    data_port_historico = pd.read_excel(file_path, sheet_name='data_port_historico')
-    data_port_mes = pd.read_excel(file_path, sheet_name='data_port_mes')
-    
-    # Garantir que as datas estejam no formato correto
-    data_mes['date'] = pd.to_datetime(data_mes['date'])
-    
-    return data_mes, data_ano, data_port_historico, data_port_mes
+# Workspace compartilhado entre as sessões (cache de carteiras com limite de memória)
+@st.cache_resource
+def obter_workspace():
+    """Cria o workspace de carteiras uma única vez por processo"""
+    return carteiras.Workspace()
+
+# Cache para séries de benchmarks (atualizadas no máximo uma vez por hora)
+@st.cache_data(ttl=3600, show_spinner="Buscando benchmarks...")
+def carregar_benchmarks(nomes, inicio):
+    """Busca as séries de benchmarks selecionadas em paralelo"""
+    return benchmarks.buscar_series(list(nomes), inicio)
 
-# Função para transformar data_port_historico de wide para long
-@st.cache_data
-def transformar_historico(df):
-    """Transforma dados de formato wide para long"""
-    from datetime import datetime
-    
-    # Identificar colunas de datas (todas exceto as 3 primeiras)
-    date_columns = [col for col in df.columns if isinstance(col, datetime)]
-    
-    # Melt o dataframe
-    df_long = df.melt(
-        id_vars=['Tipo', 'Categoria', 'Alocação'],
-        value_vars=date_columns,
-        var_name='Data',
-        value_name='Valor'
+def selecionar_benchmarks():
+    """Filtro na sidebar com os benchmarks adicionais configurados"""
+    st.sidebar.markdown("### Benchmarks")
+    return st.sidebar.multiselect(
+        "Benchmarks adicionais",
+        options=list(config_benchmarks),
+        default=[]
     )
-    
-    # Remover linhas com valores NaN ou zero
-    df_long = df_long[df_long['Valor'].notna()]
-    df_long = df_long[df_long['Valor'] > 0]
-    
-    # Converter Data para datetime se necessário
-    df_long['Data'] = pd.to_datetime(df_long['Data'])
-    
-    return df_long
+
+def avisar_erros_benchmarks(erros):
+    """Exibe um aviso para cada benchmark que não pôde ser carregado"""
+    for nome, erro in erros.items():
+        st.warning(f"⚠️ Não foi possível carregar o benchmark {nome}: {erro}")
+
+# Sidebar - Seleção da carteira
+st.sidebar.title("💰 Dashboard de Investimentos")
+st.sidebar.markdown("---")
+
+workspace = obter_workspace()
+nomes_carteiras = workspace.carteiras()
+
+if not nomes_carteiras:
+    st.error(f"⚠️ Nenhuma planilha encontrada em '{workspace.diretorio}' nem o arquivo '{carteiras.ARQUIVO_PADRAO}'.")
+    st.stop()
+
+OPCAO_CONSOLIDADO = "🧮 Consolidado"
+
+# Descartar seleções de planilhas removidas ou renomeadas desde a última execução
+if st.session_state.get('carteira') not in nomes_carteiras + [OPCAO_CONSOLIDADO]:
+    st.session_state.pop('carteira', None)
+if 'carteiras_consolidadas' in st.session_state:
+    existentes = [nome for nome in st.session_state['carteiras_consolidadas'] if nome in nomes_carteiras]
+    if len(existentes) < len(st.session_state['carteiras_consolidadas']):
+        st.session_state['carteiras_consolidadas'] = existentes
+
+if len(nomes_carteiras) > 1:
+    carteira_selecionada = st.sidebar.selectbox(
+        "Carteira",
+        options=nomes_carteiras + [OPCAO_CONSOLIDADO],
+        key='carteira'
+    )
+else:
+    carteira_selecionada = nomes_carteiras[0]
 
 # Carregar dados
-data_mes, data_ano, data_port_historico, data_port_mes = carregar_dados()
+if carteira_selecionada == OPCAO_CONSOLIDADO:
+    # Valor inicial via estado da sessão: um default que muda entre execuções recriaria o widget
+    if 'carteiras_consolidadas' not in st.session_state:
+        st.session_state['carteiras_consolidadas'] = nomes_carteiras
+    
+    carteiras_consolidadas = st.sidebar.multiselect(
+        "Carteiras consolidadas",
+        options=nomes_carteiras,
+        key='carteiras_consolidadas'
+    )
+    
+    if not carteiras_consolidadas:
+        st.warning("⚠️ Selecione ao menos uma carteira para consolidar.")
+        st.stop()
+
+try:
+    if carteira_selecionada == OPCAO_CONSOLIDADO:
+        carteira = workspace.consolidar(carteiras_consolidadas)
+    else:
+        carteira = workspace.obter(carteira_selecionada)
+except carteiras.CarteiraNaoEncontrada as erro:
+    st.error(f"⚠️ {erro}. Atualize a página para selecionar outra carteira.")
+    st.stop()
+
+data_mes, data_ano, data_port_historico, data_port_mes = (
+    carteira.data_mes, carteira.data_ano, carteira.data_port_historico, carteira.data_port_mes
+)
+config_benchmarks = benchmarks.carregar_config()
 
 # Sidebar - Navegação
-st.sidebar.title("💰 Dashboard de Investimentos")
 st.sidebar.markdown("---")
 
+# A visão consolidada soma posições e alocações; a performance (TWR) não é somável
+paginas = ["🔄 Evolução do Portfólio", "💼 Posição Atual"]
+if not carteira.consolidada:
+    paginas = ["📊 Performance Mensal", "📈 Performance Anual"] + paginas
+
 pagina = st.sidebar.radio(
     "Navegação",
-    ["📊 Performance Mensal", "📈 Performance Anual", "🔄 Evolução do Portfólio", "💼 Posição Atual"]
+    paginas
 )
 
 st.sidebar.markdown("---")
@@ -94,6 +141,8 @@ st.sidebar.info("Dashboard interativo para análise de investimentos com dados e
 if pagina == "📊 Performance Mensal":
     st.title("📊 Análise Mensal de Investimentos")
     
+    benchmarks_selecionados = selecionar_benchmarks()
+    
     # Métricas principais
     col1, col2, col3 = st.columns(3)
     
@@ -153,6 +202,21 @@ if pagina == "📊 Performance Mensal":
         line=dict(color='#2ca02c', width=2)
     ))
     
+    # Benchmarks adicionais (alinhados às datas de data_mes)
+    if benchmarks_selecionados:
+        inicio = (benchmarks.data_base_mensal(data_mes['date']) - timedelta(days=10)).date()
+        indices, erros = carregar_benchmarks(tuple(benchmarks_selecionados), inicio)
+        avisar_erros_benchmarks(erros)
+        
+        for nome, indice in indices.items():
+            fig1.add_trace(go.Scatter(
+                x=data_mes['date'],
+                y=benchmarks.alinhar_mensal(indice, data_mes['date']) * 100,
+                mode='lines',
+                name=nome,
+                line=dict(color=config_benchmarks[nome].get('cor'), width=2)
+            ))
+    
     fig1.update_layout(
         xaxis_title="Data",
         yaxis_title="Rentabilidade Acumulada (%)",
@@ -207,6 +271,18 @@ if pagina == "📊 Performance Mensal":
 elif pagina == "📈 Performance Anual":
     st.title("📈 Análise Anual de Investimentos")
     
+    benchmarks_selecionados = selecionar_benchmarks()
+    
+    # Benchmarks adicionais (alinhados aos anos de data_ano)
+    benchmarks_anuais = {}
+    if benchmarks_selecionados:
+        inicio = (benchmarks.data_base_anual(data_ano['date']) - timedelta(days=10)).date()
+        indices, erros = carregar_benchmarks(tuple(benchmarks_selecionados), inicio)
+        avisar_erros_benchmarks(erros)
+        
+        for nome, indice in indices.items():
+            benchmarks_anuais[nome] = benchmarks.alinhar_anual(indice, data_ano['date'])
+    
     # Métricas principais do último ano
     ultimo_ano = data_ano.iloc[-1]
     
@@ -270,6 +346,16 @@ elif pagina == "📈 Performance Anual":
         marker=dict(size=6)
     ))
     
+    for nome, (acumulado, _) in benchmarks_anuais.items():
+        fig1.add_trace(go.Scatter(
+            x=data_ano['date'],
+            y=acumulado * 100,
+            mode='lines+markers',
+            name=nome,
+            line=dict(color=config_benchmarks[nome].get('cor'), width=2),
+            marker=dict(size=6)
+        ))
+    
     fig1.update_layout(
         xaxis_title="Ano",
         yaxis_title="Rentabilidade Acumulada (%)",
@@ -348,6 +434,14 @@ elif pagina == "📈 Performance Anual":
         marker_color='#2ca02c'
     ))
     
+    for nome, (_, anual) in benchmarks_anuais.items():
+        fig3.add_trace(go.Bar(
+            x=data_ano['date'],
+            y=anual * 100,
+            name=nome,
+            marker_color=config_benchmarks[nome].get('cor')
+        ))
+    
     # Adicionar linha zero
     fig3.add_hline(y=0, line_dash="dash", line_color="red", annotation_text="Zero")
     
@@ -366,7 +460,7 @@ elif pagina == "🔄 Evolução do Portfólio":
     st.title("🔄 Evolução Histórica por Alocação")
     
     # Transformar dados
-    df_historico_long = transformar_historico(data_port_historico)
+    df_historico_long = carteira.historico_long
     
     # Filtros na sidebar
     st.sidebar.markdown("### Filtros")
@@ -0,0 +1,341 @@
+"""Séries de benchmarks (CDI, IPCA, IFIX, S&P 500, ...) obtidas de fontes externas.
+
+Cada série é descrita por um provedor (``bcb``, ``yahoo`` ou ``arquivo``), um
+código na fonte e o tipo do valor retornado (``nivel`` para cotações/índices,
+``taxa`` para rentabilidades percentuais por período). Os valores baixados são
+guardados em um cache local em CSV que só busca as datas ainda não armazenadas.
+"""
+import json
+import numbers
+import os
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import pandas as pd
+
+# Séries disponíveis por padrão (podem ser sobrescritas em benchmarks.json)
+SERIES_PADRAO = {
+    'CDI': {'provedor': 'bcb', 'codigo': '12', 'tipo': 'taxa', 'cor': '#d62728'},
+    'IPCA': {'provedor': 'bcb', 'codigo': '433', 'tipo': 'taxa', 'cor': '#bcbd22'},
+    'S&P 500': {'provedor': 'yahoo', 'codigo': '^GSPC', 'tipo': 'nivel', 'cor': '#17becf'},
+    # Não há API pública gratuita para o IFIX: usar um CSV em ARQUIVOS_DIR
+    'IFIX': {'provedor': 'arquivo', 'codigo': 'ifix', 'tipo': 'nivel', 'cor': '#7f7f7f'},
+}
+
+CONFIG_PATH = 'benchmarks.json'
+CACHE_DIR = os.environ.get('BENCHMARKS_CACHE_DIR', '.cache_benchmarks')
+ARQUIVOS_DIR = os.environ.get('BENCHMARKS_ARQUIVOS_DIR', 'benchmarks')
+
+# Se definido, todas as séries são lidas de CSVs nesse diretório (uso offline/testes)
+OFFLINE_DIR = os.environ.get('BENCHMARKS_OFFLINE_DIR')
+
+TIMEOUT = 30
+MAX_WORKERS = 4
+
+
+# ========== PROVEDORES ==========
+class Provedor:
+    """Interface dos provedores: retorna os valores brutos de uma série entre duas datas"""
+
+    def buscar(self, codigo, inicio, fim):
+        """Retorna uma pd.Series indexada por data com os valores entre inicio e fim (inclusive)"""
+        raise NotImplementedError
+
+
+def _baixar_json(url):
+    """Faz uma requisição GET e decodifica a resposta JSON"""
+    req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
+    with urllib.request.urlopen(req, timeout=TIMEOUT) as resposta:
+        return json.loads(resposta.read().decode('utf-8'))
+
+
+def _serie_vazia():
+    return pd.Series(dtype=float, index=pd.DatetimeIndex([], name='date'), name='valor')
+
+
+class ProvedorBCB(Provedor):
+    """Sistema Gerenciador de Séries Temporais (SGS) do Banco Central"""
+
+    URL = 'https://api.bcb.gov.br/dados/serie/bcdata.sgs.{codigo}/dados'
+
+    # A API limita séries diárias a janelas de 10 anos por requisição
+    JANELA_ANOS = 10
+
+    def buscar(self, codigo, inicio, fim):
+        partes = []
+        atual = inicio
+        while atual <= fim:
+            limite = min(fim, date(atual.year + self.JANELA_ANOS, atual.month, 1) - timedelta(days=1))
+            params = urllib.parse.urlencode({
+                'formato': 'json',
+                'dataInicial': atual.strftime('%d/%m/%Y'),
+                'dataFinal': limite.strftime('%d/%m/%Y'),
+            })
+            try:
+                dados = _baixar_json(f"{self.URL.format(codigo=codigo)}?{params}")
+            except urllib.error.HTTPError as erro:
+                # A API responde 404 quando não há observações no período
+                if erro.code != 404:
+                    raise
+                dados = []
+            if dados:
+                partes.append(pd.Series(
+                    [float(d['valor']) for d in dados],
+                    index=pd.to_datetime([d['data'] for d in dados], format='%d/%m/%Y'),
+                ))
+            atual = limite + timedelta(days=1)
+
+        if not partes:
+            return _serie_vazia()
+        return pd.concat(partes)
+
+
+class ProvedorYahoo(Provedor):
+    """Cotações de fechamento ajustadas do Yahoo Finance"""
+
+    URL = 'https://query1.finance.yahoo.com/v8/finance/chart/{codigo}'
+
+    def buscar(self, codigo, inicio, fim):
+        params = urllib.parse.urlencode({
+            'period1': int(pd.Timestamp(inicio).timestamp()),
+            'period2': int(pd.Timestamp(fim + timedelta(days=1)).timestamp()),
+            'interval': '1d',
+        })
+        dados = _baixar_json(f"{self.URL.format(codigo=urllib.parse.quote(codigo))}?{params}")
+        resultado = dados['chart']['result'][0]
+        if 'timestamp' not in resultado:
+            return _serie_vazia()
+
+        indicadores = resultado['indicators']
+        if indicadores.get('adjclose'):
+            valores = indicadores['adjclose'][0]['adjclose']
+        else:
+            valores = indicadores['quote'][0]['close']
+
+        serie = pd.Series(
+            valores,
+            index=pd.to_datetime(resultado['timestamp'], unit='s').normalize(),
+            dtype=float,
+        )
+        return serie.dropna()
+
+
+class ProvedorArquivo(Provedor):
+    """Lê a série de um CSV local ``<diretorio>/<codigo>.csv`` com colunas date,valor"""
+
+    def __init__(self, diretorio=None):
+        self.diretorio = diretorio or ARQUIVOS_DIR
+
+    def buscar(self, codigo, inicio, fim):
+        caminho = os.path.join(self.diretorio, f"{codigo}.csv")
+        df = pd.read_csv(caminho, parse_dates=['date'])
+        serie = df.set_index('date')['valor'].astype(float)
+        return serie[(serie.index >= pd.Timestamp(inicio)) & (serie.index <= pd.Timestamp(fim))]
+
+
+PROVEDORES = {
+    'bcb': ProvedorBCB,
+    'yahoo': ProvedorYahoo,
+    'arquivo': ProvedorArquivo,
+}
+
+
+def carregar_config(caminho=CONFIG_PATH):
+    """Retorna as séries configuradas: padrões + entradas de benchmarks.json, se existir"""
+    series = {nome: dict(cfg) for nome, cfg in SERIES_PADRAO.items()}
+    if os.path.exists(caminho):
+        with open(caminho, encoding='utf-8') as f:
+            for nome, cfg in json.load(f).items():
+                if cfg is None:
+                    series.pop(nome, None)  # null remove uma série padrão
+                else:
+                    series[nome] = {**series.get(nome, {'tipo': 'nivel'}), **cfg}
+    return series
+
+
+def obter_provedor(cfg):
+    """Instancia o provedor de uma série (ou o provedor offline, se configurado)"""
+    if OFFLINE_DIR:
+        return ProvedorArquivo(OFFLINE_DIR)
+    return PROVEDORES[cfg['provedor']]()
+
+
+# ========== CACHE INCREMENTAL ==========
+_locks_cache = {}
+_lock_global = threading.Lock()
+
+
+def _lock_arquivo(caminho):
+    """Lock por arquivo de cache, para sessões simultâneas não escreverem o mesmo CSV"""
+    with _lock_global:
+        return _locks_cache.setdefault(caminho, threading.Lock())
+
+
+def _caminho_cache(cfg, diretorio):
+    provedor = 'offline' if OFFLINE_DIR else cfg['provedor']
+    chave = f"{provedor}_{cfg['codigo']}"
+    chave = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in chave)
+    return os.path.join(diretorio, f"{chave}.csv")
+
+
+def _gravar(caminho, conteudo):
+    """Grava um arquivo do cache de forma atômica"""
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        f.write(conteudo)
+    os.replace(temporario, caminho)
+
+
+def atualizar_serie(cfg, inicio, fim, diretorio=None):
+    """Retorna os valores brutos da série entre inicio e fim usando o cache local.
+
+    Apenas os trechos anteriores ao início já coberto ou a partir do último
+    dado armazenado são buscados no provedor. O início coberto fica em um
+    arquivo ``.inicio`` ao lado do CSV, pois séries esparsas (mensais, ou
+    diárias a partir de um feriado) não têm dado na data inicial pedida. O
+    último dia é sempre buscado de novo, pois pode ter sido gravado com a
+    cotação parcial de um pregão aberto.
+    """
+    diretorio = diretorio or CACHE_DIR
+    caminho = _caminho_cache(cfg, diretorio)
+    caminho_inicio = f"{caminho}.inicio"
+    provedor = obter_provedor(cfg)
+
+    with _lock_arquivo(caminho):
+        if os.path.exists(caminho):
+            serie = pd.read_csv(caminho, parse_dates=['date']).set_index('date')['valor']
+        else:
+            serie = _serie_vazia()
+
+        trechos = []
+        coberto_alterado = False
+        if serie.empty:
+            coberto, coberto_alterado = inicio, True
+            trechos.append((inicio, fim))
+        else:
+            coberto = serie.index.min().date()
+            if os.path.exists(caminho_inicio):
+                with open(caminho_inicio, encoding='utf-8') as f:
+                    coberto = min(coberto, date.fromisoformat(f.read().strip()))
+            ultima = serie.index.max().date()
+            if inicio < coberto:
+                trechos.append((inicio, coberto - timedelta(days=1)))
+                coberto, coberto_alterado = inicio, True
+            if fim >= ultima:
+                trechos.append((ultima, fim))
+
+        novos = [provedor.buscar(cfg['codigo'], a, b) for a, b in trechos]
+        novos = [n for n in novos if not n.empty]
+        if novos:
+            serie = pd.concat([serie] + novos)
+            serie = serie[~serie.index.duplicated(keep='last')].sort_index()
+            serie.index.name = 'date'
+            serie.name = 'valor'
+
+        if not serie.empty:
+            os.makedirs(diretorio, exist_ok=True)
+            if novos:
+                _gravar(caminho, serie.to_csv(header=True))
+            if coberto_alterado:
+                _gravar(caminho_inicio, coberto.isoformat())
+
+    return serie[(serie.index >= pd.Timestamp(inicio)) & (serie.index <= pd.Timestamp(fim))]
+
+
+def para_indice(serie, tipo, inicio=None):
+    """Converte os valores brutos em um número-índice (séries de taxa são capitalizadas).
+
+    Séries de taxa recebem o nível 1,0 na véspera de ``inicio`` (ou da primeira
+    observação), para que a data base tenha o nível anterior à capitalização.
+    """
+    if tipo != 'taxa':
+        return serie
+
+    indice = (1 + serie / 100).cumprod()
+    ancora = pd.Timestamp(inicio or serie.index[0]) - pd.Timedelta(days=1)
+    if ancora < indice.index[0]:
+        indice = pd.concat([pd.Series([1.0], index=[ancora]), indice])
+    return indice
+
+
+def buscar_series(nomes, inicio, fim=None, config=None):
+    """Busca várias séries em paralelo e retorna (indices, erros).
+
+    ``indices`` mapeia o nome de cada série ao seu número-índice diário;
+    ``erros`` mapeia o nome das séries que falharam à mensagem de erro.
+    """
+    config = config or carregar_config()
+    fim = min(fim or date.today(), date.today())
+
+    def _buscar(nome):
+        cfg = config[nome]
+        serie = atualizar_serie(cfg, inicio, fim)
+        if serie.empty:
+            raise ValueError("série sem dados no período")
+        return para_indice(serie, cfg['tipo'], inicio)
+
+    indices, erros = {}, {}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futuros = {nome: executor.submit(_buscar, nome) for nome in nomes}
+        for nome, futuro in futuros.items():
+            try:
+                indices[nome] = futuro.result()
+            except Exception as erro:
+                erros[nome] = str(erro)
+    return indices, erros
+
+
+# ========== ALINHAMENTO ÀS DATAS DA PLANILHA ==========
+def data_base_mensal(datas):
+    """Data a partir da qual a rentabilidade acumulada mensal é medida (um mês antes da primeira data)"""
+    return pd.Timestamp(datas.min()) - pd.DateOffset(months=1)
+
+
+MESES = ['jan', 'fev', 'mar', 'abr', 'mai', 'jun', 'jul', 'ago', 'set', 'out', 'nov', 'dez']
+
+
+def fim_do_periodo(valor):
+    """Converte a coluna date de data_ano no último dia do período.
+
+    Aceita o formato da planilha (``'2018-dez.'``, ``'2025-out.'`` para o ano
+    corrente), anos inteiros (fim do ano) e datas (fim do mês).
+    """
+    if isinstance(valor, numbers.Number):
+        return pd.Timestamp(int(valor), 12, 31)
+    if isinstance(valor, str):
+        texto = valor.replace('\xa0', ' ').strip().lower().rstrip('.')
+        ano, _, mes = texto.partition('-')
+        if mes in MESES:
+            return pd.Timestamp(int(ano), MESES.index(mes) + 1, 1) + pd.offsets.MonthEnd(0)
+    return pd.Timestamp(valor) + pd.offsets.MonthEnd(0)
+
+
+def data_base_anual(anos):
+    """Data a partir da qual a rentabilidade acumulada anual é medida (fim do ano anterior ao primeiro)"""
+    return pd.Timestamp(min(fim_do_periodo(a) for a in anos).year - 1, 12, 31)
+
+
+def alinhar_mensal(indice, datas):
+    """Rentabilidade acumulada do índice em cada data de data_mes (mesma convenção de twr_acc)"""
+    datas = pd.to_datetime(pd.Series(datas))
+    base = indice.asof(data_base_mensal(datas))
+    if pd.isna(base):
+        base = indice.iloc[0]
+    return pd.Series(indice.asof(pd.DatetimeIndex(datas)).values / base - 1, index=datas.index)
+
+
+def alinhar_anual(indice, anos):
+    """Rentabilidades (acumulada, anual) do índice em cada linha de data_ano"""
+    fins = pd.DatetimeIndex([fim_do_periodo(a) for a in anos])
+    niveis = pd.Series(indice.asof(fins).values, index=pd.Series(anos).index)
+
+    base = indice.asof(data_base_anual(anos))
+    if pd.isna(base):
+        base = indice.iloc[0]
+    anteriores = niveis.shift(1)
+    anteriores.iloc[0] = base
+    return niveis / base - 1, niveis / anteriores - 1
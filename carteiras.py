@@ -0,0 +1,237 @@
+"""Carteiras (planilhas) servidas por uma única instância do dashboard.
+
+Cada arquivo ``.xlsx`` em CARTEIRAS_DIR é uma carteira. As carteiras são
+carregadas sob demanda e mantidas em um cache LRU compartilhado entre as
+sessões, limitado a CARTEIRAS_MEMORIA_MB; as menos usadas são descartadas
+quando o limite é ultrapassado e recarregadas no próximo acesso.
+"""
+import glob
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+
+CARTEIRAS_DIR = os.environ.get('CARTEIRAS_DIR', 'carteiras')
+ARQUIVO_PADRAO = 'datainvest.xlsx'
+MEMORIA_MAX_MB = float(os.environ.get('CARTEIRAS_MEMORIA_MB', 512))
+
+
+class CarteiraNaoEncontrada(LookupError):
+    """A planilha da carteira não existe mais (removida ou renomeada)"""
+
+
+def listar_carteiras(diretorio=None):
+    """Retorna {nome: caminho} das planilhas disponíveis (ou só datainvest.xlsx, se não houver diretório)"""
+    diretorio = diretorio or CARTEIRAS_DIR
+    caminhos = sorted(glob.glob(os.path.join(diretorio, '*.xlsx')))
+    # Ignorar arquivos temporários do Excel (~$arquivo.xlsx)
+    caminhos = [c for c in caminhos if not os.path.basename(c).startswith('~$')]
+
+    if not caminhos and os.path.exists(ARQUIVO_PADRAO):
+        caminhos = [ARQUIVO_PADRAO]
+    return {os.path.splitext(os.path.basename(c))[0]: c for c in caminhos}
+
+
+def carregar_planilha(file_path):
+    """Carrega todas as abas da planilha Excel"""
+    # Carregar cada aba
+    data_mes = pd.read_excel(file_path, sheet_name='data_mes')
+    data_ano = pd.read_excel(file_path, sheet_name='data_ano')
+    data_port_historico = pd.read_excel(file_path, sheet_name='data_port_historico')
+    data_port_mes = pd.read_excel(file_path, sheet_name='data_port_mes')
+
+    # Garantir que as datas estejam no formato correto
+    data_mes['date'] = pd.to_datetime(data_mes['date'])
+
+    return data_mes, data_ano, data_port_historico, data_port_mes
+
+
+def colunas_de_data(df):
+    """Colunas de data_port_historico que correspondem a datas"""
+    return [col for col in df.columns if isinstance(col, datetime)]
+
+
+def transformar_historico(df):
+    """Transforma dados de formato wide para long"""
+    # Identificar colunas de datas (todas exceto as 3 primeiras)
+    date_columns = colunas_de_data(df)
+
+    # Melt o dataframe
+    df_long = df.melt(
+        id_vars=['Tipo', 'Categoria', 'Alocação'],
+        value_vars=date_columns,
+        var_name='Data',
+        value_name='Valor'
+    )
+
+    # Remover linhas com valores NaN ou zero
+    df_long = df_long[df_long['Valor'].notna()]
+    df_long = df_long[df_long['Valor'] > 0]
+
+    # Converter Data para datetime se necessário
+    df_long['Data'] = pd.to_datetime(df_long['Data'])
+
+    return df_long
+
+
+class Carteira:
+    """Dados de uma carteira (ou da consolidação de várias) e seus agregados"""
+
+    def __init__(self, nome, data_mes, data_ano, data_port_historico, data_port_mes):
+        self.nome = nome
+        self.data_mes = data_mes
+        self.data_ano = data_ano
+        self.data_port_historico = data_port_historico
+        self.data_port_mes = data_port_mes
+        self.historico_long = transformar_historico(data_port_historico)
+
+    @property
+    def consolidada(self):
+        """Carteiras consolidadas não têm histórico de performance (data_mes/data_ano)"""
+        return self.data_mes is None
+
+    @property
+    def tamanho(self):
+        """Memória ocupada pelos DataFrames, em bytes"""
+        dfs = [self.data_mes, self.data_ano, self.data_port_historico, self.data_port_mes, self.historico_long]
+        return int(sum(df.memory_usage(deep=True).sum() for df in dfs if df is not None))
+
+
+def consolidar_posicao(dfs):
+    """Soma data_port_mes de várias carteiras por ativo.
+
+    Valores são somados; lucro_total_pct e xirr são recalculados como médias
+    ponderadas pelo valor investido.
+    """
+    df = pd.concat(dfs, ignore_index=True)
+
+    # Ponderar apenas os ativos que possuem a métrica
+    for coluna in ['lucro_total_pct', 'xirr']:
+        df[f'_peso_{coluna}'] = df['vlr_investido'].where(df[coluna].notna(), 0)
+        df[f'_ponderado_{coluna}'] = (df[coluna] * df['vlr_investido']).fillna(0)
+
+    agrupado = df.groupby('ativo', sort=False).agg(
+        Nome=('Nome', 'first'),
+        Tipo=('Tipo', 'first'),
+        classe=('classe', 'first'),
+        setor=('setor', 'first'),
+        vlr_investido=('vlr_investido', 'sum'),
+        vlr_mercado=('vlr_mercado', 'sum'),
+        lucro_total=('lucro_total', 'sum'),
+        _peso_lucro_total_pct=('_peso_lucro_total_pct', 'sum'),
+        _ponderado_lucro_total_pct=('_ponderado_lucro_total_pct', 'sum'),
+        _peso_xirr=('_peso_xirr', 'sum'),
+        _ponderado_xirr=('_ponderado_xirr', 'sum'),
+    )
+
+    for coluna in ['lucro_total_pct', 'xirr']:
+        peso = agrupado.pop(f'_peso_{coluna}')
+        ponderado = agrupado.pop(f'_ponderado_{coluna}')
+        agrupado[coluna] = (ponderado / peso).where(peso != 0)
+
+    return agrupado.reset_index()
+
+
+def consolidar_historico(dfs):
+    """Soma data_port_historico de várias carteiras por Tipo/Categoria/Alocação"""
+    df = pd.concat(dfs, ignore_index=True)
+    date_columns = sorted(colunas_de_data(df))
+
+    return df.groupby(['Tipo', 'Categoria', 'Alocação'], sort=False)[date_columns].sum(min_count=1).reset_index()
+
+
+class Workspace:
+    """Cache LRU de carteiras e consolidações, com limite global de memória"""
+
+    def __init__(self, diretorio=None, memoria_max_mb=MEMORIA_MAX_MB):
+        self.diretorio = diretorio or CARTEIRAS_DIR
+        self.memoria_max = int(memoria_max_mb * 1024 * 1024)
+
+        # chave -> (versão, Carteira, tamanho em bytes), da menos para a mais usada
+        self._entradas = OrderedDict()
+        self._uso = 0
+        self._lock = threading.Lock()
+        self._locks_carga = {}
+
+    def carteiras(self):
+        """Nomes das carteiras disponíveis"""
+        return list(listar_carteiras(self.diretorio))
+
+    def uso_memoria(self):
+        """Memória ocupada pelas carteiras em cache, em bytes"""
+        with self._lock:
+            return self._uso
+
+    def obter(self, nome):
+        """Retorna a carteira, carregando a planilha no primeiro acesso ou se ela foi alterada"""
+        caminho, versao = self._localizar(nome)
+        return self._obter_cache(nome, versao, lambda: Carteira(nome, *carregar_planilha(caminho)))
+
+    def consolidar(self, nomes):
+        """Retorna a soma das posições e do histórico de alocações das carteiras informadas"""
+        nomes = tuple(sorted(nomes))
+        versao = tuple(self._localizar(n)[1] for n in nomes)
+
+        def _construir():
+            membros = [self.obter(n) for n in nomes]
+            return Carteira(
+                'Consolidado',
+                None,
+                None,
+                consolidar_historico([c.data_port_historico for c in membros]),
+                consolidar_posicao([c.data_port_mes for c in membros]),
+            )
+
+        return self._obter_cache(('consolidado',) + nomes, versao, _construir)
+
+    def _localizar(self, nome):
+        """Retorna (caminho, data de modificação) da planilha da carteira"""
+        caminho = listar_carteiras(self.diretorio).get(nome)
+        try:
+            return caminho, os.path.getmtime(caminho)
+        except (TypeError, OSError):
+            raise CarteiraNaoEncontrada(f"Carteira '{nome}' não encontrada em '{self.diretorio}'") from None
+
+    def _obter_cache(self, chave, versao, construir):
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[0] == versao:
+                self._entradas.move_to_end(chave)
+                return entrada[1]
+            lock_carga = self._locks_carga.setdefault(chave, threading.Lock())
+
+        # Sessões que pedem a mesma carteira esperam uma única carga
+        with lock_carga:
+            with self._lock:
+                entrada = self._entradas.get(chave)
+                if entrada is not None and entrada[0] == versao:
+                    self._entradas.move_to_end(chave)
+                    return entrada[1]
+
+            try:
+                carteira = construir()
+            except Exception:
+                with self._lock:
+                    if chave not in self._entradas:
+                        self._locks_carga.pop(chave, None)
+                raise
+            tamanho = carteira.tamanho
+
+            with self._lock:
+                anterior = self._entradas.pop(chave, None)
+                if anterior is not None:
+                    self._uso -= anterior[2]
+                self._entradas[chave] = (versao, carteira, tamanho)
+                self._uso += tamanho
+                self._liberar()
+
+        return carteira
+
+    def _liberar(self):
+        """Descarta as entradas menos usadas até respeitar o limite (a mais recente é sempre mantida)"""
+        while self._uso > self.memoria_max and len(self._entradas) > 1:
+            chave, (_, _, tamanho) = self._entradas.popitem(last=False)
+            self._locks_carga.pop(chave, None)
+            self._uso -= tamanho
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+PLANILHA = os.path.join(RAIZ, 'datainvest.xlsx')
+
+
+@pytest.fixture(scope='session')
+def data_mes():
+    df = pd.read_excel(PLANILHA, sheet_name='data_mes')
+    df['date'] = pd.to_datetime(df['date'])
+    return df
+
+
+@pytest.fixture(scope='session')
+def data_ano():
+    return pd.read_excel(PLANILHA, sheet_name='data_ano')
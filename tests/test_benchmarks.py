@@ -0,0 +1,140 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import benchmarks
+
+
+class ProvedorRegistrado(benchmarks.ProvedorArquivo):
+    """ProvedorArquivo que registra os períodos solicitados"""
+
+    chamadas = []
+
+    def buscar(self, codigo, inicio, fim):
+        self.chamadas.append((inicio, fim))
+        return super().buscar(codigo, inicio, fim)
+
+
+@pytest.fixture
+def cfg(tmp_path, monkeypatch):
+    arquivos = tmp_path / 'arquivos'
+    arquivos.mkdir()
+    datas = pd.date_range('2024-01-01', '2024-03-31', freq='D')
+    pd.DataFrame({'date': datas, 'valor': range(1, len(datas) + 1)}).to_csv(arquivos / 'teste.csv', index=False)
+
+    ProvedorRegistrado.chamadas = []
+    monkeypatch.setattr(benchmarks, 'ARQUIVOS_DIR', str(arquivos))
+    monkeypatch.setattr(benchmarks, 'CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(benchmarks, 'OFFLINE_DIR', None)
+    monkeypatch.setitem(benchmarks.PROVEDORES, 'arquivo', ProvedorRegistrado)
+    return {'provedor': 'arquivo', 'codigo': 'teste', 'tipo': 'nivel'}
+
+
+def indice_ibov(data_mes):
+    """Número-índice do Ibovespa nos fins de mês, reconstruído a partir de ibov_mes"""
+    niveis = pd.Series((1 + data_mes['ibov_mes']).cumprod().values, index=data_mes['date'])
+    base = pd.Series([1.0], index=[benchmarks.data_base_mensal(data_mes['date'])])
+    return pd.concat([base, niveis])
+
+
+def test_cache_busca_apenas_datas_novas(cfg):
+    serie = benchmarks.atualizar_serie(cfg, date(2024, 1, 1), date(2024, 1, 31))
+    assert len(serie) == 31
+    assert ProvedorRegistrado.chamadas == [(date(2024, 1, 1), date(2024, 1, 31))]
+
+    serie = benchmarks.atualizar_serie(cfg, date(2024, 1, 1), date(2024, 2, 29))
+    assert len(serie) == 60
+    assert serie.iloc[-1] == 60
+    # O último dia armazenado é buscado de novo, junto com as datas posteriores
+    assert ProvedorRegistrado.chamadas[1:] == [(date(2024, 1, 31), date(2024, 2, 29))]
+
+
+def test_cache_busca_datas_anteriores(cfg):
+    benchmarks.atualizar_serie(cfg, date(2024, 2, 1), date(2024, 2, 10))
+    serie = benchmarks.atualizar_serie(cfg, date(2024, 1, 20), date(2024, 2, 5))
+    assert serie.index.min() == pd.Timestamp('2024-01-20')
+    assert ProvedorRegistrado.chamadas[1:] == [(date(2024, 1, 20), date(2024, 1, 31))]
+
+
+def test_cache_nao_rebusca_inicio_sem_dados(cfg):
+    # Não há dados antes de 2024-01-01: o período já consultado não é pedido de novo
+    benchmarks.atualizar_serie(cfg, date(2023, 12, 20), date(2024, 1, 31))
+    benchmarks.atualizar_serie(cfg, date(2023, 12, 20), date(2024, 1, 31))
+    benchmarks.atualizar_serie(cfg, date(2023, 12, 25), date(2024, 1, 31))
+
+    assert ProvedorRegistrado.chamadas == [
+        (date(2023, 12, 20), date(2024, 1, 31)),
+        (date(2024, 1, 31), date(2024, 1, 31)),
+        (date(2024, 1, 31), date(2024, 1, 31)),
+    ]
+
+
+def test_cache_atualiza_ultimo_dia(cfg, tmp_path):
+    benchmarks.atualizar_serie(cfg, date(2024, 1, 1), date(2024, 1, 31))
+
+    # Simula uma cotação parcial gravada para o último dia
+    caminho = benchmarks._caminho_cache(cfg, benchmarks.CACHE_DIR)
+    cache = pd.read_csv(caminho)
+    cache.loc[cache.index[-1], 'valor'] = -1
+    cache.to_csv(caminho, index=False)
+
+    serie = benchmarks.atualizar_serie(cfg, date(2024, 1, 1), date(2024, 1, 31))
+    assert serie.iloc[-1] == 31
+
+
+def test_buscar_series_reporta_erros(cfg):
+    config = {'Teste': cfg, 'Inexistente': dict(cfg, codigo='inexistente')}
+    indices, erros = benchmarks.buscar_series(['Teste', 'Inexistente'], date(2024, 1, 1), date(2024, 1, 31), config)
+    assert list(indices) == ['Teste']
+    assert list(erros) == ['Inexistente']
+
+
+def test_para_indice_taxa():
+    serie = pd.Series([1.0, 1.0], index=pd.to_datetime(['2024-01-01', '2024-01-02']))
+    indice = benchmarks.para_indice(serie, 'taxa')
+    assert indice.index[0] == pd.Timestamp('2023-12-31')
+    assert indice.tolist() == pytest.approx([1.0, 1.01, 1.0201])
+
+
+def test_fim_do_periodo(data_ano):
+    fins = [benchmarks.fim_do_periodo(a) for a in data_ano['date']]
+    assert fins[0] == pd.Timestamp('2018-12-31')
+    assert fins[-1] == pd.Timestamp('2025-10-31')
+    assert benchmarks.data_base_anual(data_ano['date']) == pd.Timestamp('2017-12-31')
+    assert benchmarks.fim_do_periodo(2020) == pd.Timestamp('2020-12-31')
+
+
+def test_alinhar_mensal_planilha(data_mes):
+    acumulado = benchmarks.alinhar_mensal(indice_ibov(data_mes), data_mes['date'])
+    assert acumulado.tolist() == pytest.approx(data_mes['ibov_acc'].tolist())
+
+
+def test_alinhar_anual_planilha(data_mes, data_ano):
+    acumulado, anual = benchmarks.alinhar_anual(indice_ibov(data_mes), data_ano['date'])
+
+    # Anos completos: data_ano traz os valores arredondados em 4 casas
+    completos = data_ano.index[:-1]
+    assert acumulado[completos].tolist() == pytest.approx(data_ano.loc[completos, 'ibov_acc'].tolist(), abs=1e-4)
+    assert anual[completos].tolist() == pytest.approx(data_ano.loc[completos, 'ibov_ano'].tolist(), abs=1e-4)
+
+    # Ano corrente (parcial): medido até o último mês de data_mes, não até 31/12
+    assert acumulado.iloc[-1] == pytest.approx(data_mes['ibov_acc'].iloc[-1])
+
+
+def test_alinhar_taxa_mensal(cfg, data_mes, data_ano):
+    # IPCA constante de 1% ao mês, datado no dia 1º de cada mês como no SGS
+    meses = pd.date_range('2018-01-01', '2025-10-01', freq='MS')
+    pd.DataFrame({'date': meses, 'valor': 1.0}).to_csv(f"{benchmarks.ARQUIVOS_DIR}/ipca.csv", index=False)
+    ipca = dict(cfg, codigo='ipca', tipo='taxa')
+
+    inicio = (benchmarks.data_base_mensal(data_mes['date']) - pd.Timedelta(days=10)).date()
+    indices, erros = benchmarks.buscar_series(['IPCA'], inicio, date(2025, 10, 31), {'IPCA': ipca})
+    assert not erros
+
+    acumulado = benchmarks.alinhar_mensal(indices['IPCA'], data_mes['date'])
+    assert acumulado.tolist() == pytest.approx([1.01 ** (i + 1) - 1 for i in range(len(data_mes))])
+
+    acumulado, anual = benchmarks.alinhar_anual(indices['IPCA'], data_ano['date'])
+    assert anual.tolist() == pytest.approx([1.01 ** 12 - 1] * 7 + [1.01 ** 10 - 1])
+    assert acumulado.iloc[0] == pytest.approx(1.01 ** 12 - 1)
@@ -0,0 +1,72 @@
+import os
+import shutil
+
+import pytest
+
+import carteiras
+from conftest import PLANILHA
+
+
+@pytest.fixture
+def diretorio(tmp_path):
+    for nome in ['a', 'b', 'c']:
+        shutil.copy(PLANILHA, tmp_path / f'{nome}.xlsx')
+    return tmp_path
+
+
+@pytest.fixture(scope='module')
+def original():
+    return carteiras.Carteira('original', *carteiras.carregar_planilha(PLANILHA))
+
+
+def test_lru_respeita_limite_de_memoria(diretorio, original):
+    # Cabem duas carteiras no limite
+    workspace = carteiras.Workspace(str(diretorio), memoria_max_mb=2.5 * original.tamanho / 1024 / 1024)
+
+    workspace.obter('a')
+    workspace.obter('b')
+    workspace.obter('a')
+    workspace.obter('c')
+
+    assert list(workspace._entradas) == ['a', 'c']
+    assert set(workspace._locks_carga) == {'a', 'c'}
+    assert workspace.uso_memoria() == 2 * original.tamanho
+
+
+def test_recarrega_planilha_alterada(diretorio):
+    workspace = carteiras.Workspace(str(diretorio))
+    carteira = workspace.obter('a')
+    assert workspace.obter('a') is carteira
+
+    modificacao = os.path.getmtime(diretorio / 'a.xlsx') + 10
+    os.utime(diretorio / 'a.xlsx', (modificacao, modificacao))
+
+    assert workspace.obter('a') is not carteira
+    assert workspace.uso_memoria() == carteira.tamanho
+
+
+def test_carteira_removida(diretorio):
+    workspace = carteiras.Workspace(str(diretorio))
+    os.remove(diretorio / 'b.xlsx')
+
+    with pytest.raises(carteiras.CarteiraNaoEncontrada):
+        workspace.obter('b')
+    with pytest.raises(carteiras.CarteiraNaoEncontrada):
+        workspace.consolidar(['a', 'b'])
+
+
+def test_consolidado_soma_carteiras(diretorio, original):
+    workspace = carteiras.Workspace(str(diretorio))
+    consolidado = workspace.consolidar(['a', 'b'])
+
+    assert consolidado.consolidada
+    assert consolidado.data_port_mes['vlr_mercado'].sum() == pytest.approx(2 * original.data_port_mes['vlr_mercado'].sum())
+    assert consolidado.historico_long['Valor'].sum() == pytest.approx(2 * original.historico_long['Valor'].sum())
+
+    # Carteiras idênticas: as médias ponderadas mantêm os valores por ativo
+    posicao = consolidado.data_port_mes.set_index('ativo')
+    esperado = original.data_port_mes.set_index('ativo')
+    assert posicao.loc[esperado.index, 'xirr'].tolist() == pytest.approx(esperado['xirr'].tolist(), nan_ok=True)
+    assert posicao.loc[esperado.index, 'lucro_total_pct'].tolist() == pytest.approx(esperado['lucro_total_pct'].tolist())
+
+    assert workspace.consolidar(['b', 'a']) is consolidado